@@ -19,6 +19,12 @@ blob_delimiter = "|"
 # we have to encode blob_delimiter to blob_delimiter_replace on data write and decode it bach on data read
 blob_delimiter_replacement = "&delimiter;"
 
+# string type to check data cells against. 'basestring' is undefined in python 3
+try:
+    _string_types = basestring
+except NameError:
+    _string_types = str
+
 
 #--------------------------------------------
 # class CcdbSchemaVersion
@@ -429,19 +435,11 @@ def gen_flatten_data(data):
     [1, 2, 3, 4, 5, "abs"]
 
     """
-    #python 3 hack to basestr
-    try:
-        u = unicode
-    except NameError:
-        # 'unicode' is undefined, must be Python 3
-        check_type = str
-    else:
-        # 'unicode' exists, must be Python 2
-
-        check_type = basestring
-
     for el in data:
-        if isinstance(el, collections.Iterable) and not isinstance(el, check_type):
+        # strings are the most of cells. Checking them first skips the slow abstract Iterable check
+        if isinstance(el, _string_types):
+            yield el
+        elif isinstance(el, collections.Iterable):
             for sub in gen_flatten_data(el):
                 yield sub
         else:
@@ -489,24 +487,14 @@ def list_to_blob(data):
     "strings|with&delimiter;surprise"
     """
     def prepare_item(p_item):
-        if not isinstance(p_item, basestring):
-            item_str = repr(p_item)
-        else:
-            item_str = p_item
-        return item_str.replace(blob_delimiter, blob_delimiter_replacement)
-
-    if len(data) == 0:
-        return ""
-    if len(data) == 1:
-        return prepare_item(data[0])
-
-    #this for data[:-1] makes result like a1|a2|a3
-    blob = ""
-    for item in data[:-1]:
-        blob += prepare_item(item) + blob_delimiter
-    blob += prepare_item(data[-1])
+        # cells are mostly strings already (i.e. read from text files), check exact type first
+        # numbers are converted by repr, as python 2 str() truncates floats to 12 digits
+        if type(p_item) is not str and not isinstance(p_item, _string_types):
+            p_item = repr(p_item)
+        return p_item.replace(blob_delimiter, blob_delimiter_replacement)
 
-    return blob
+    #join makes result like a1|a2|a3 in one pass instead of growing the string cell by cell
+    return blob_delimiter.join([prepare_item(item) for item in data])
 
 
 #--------------------------------------------
@@ -557,12 +545,5 @@ def list_to_table(data, col_count):
             .format(len(data), col_count)
         raise ValueError(message)
 
-    row_count = len(data) // col_count
-    #cpp way
-    tabled_data = []
-    for row_i in range(row_count):
-        row = []
-        for col_i in range(col_count):
-            row.append(data[row_i * col_count + col_i])
-        tabled_data.append(row)
-    return tabled_data
+    #data is stored row by row, so each row is a slice of the flat list
+    return [data[row_start:row_start + col_count] for row_start in range(0, len(data), col_count)]
@@ -1,6 +1,10 @@
+import re
 import posixpath
 import datetime
 
+# valid name of ccdb object: directory, type table, column, variation
+_name_regex = re.compile(r'^\w+$')
+
 
 def split(path):
     return posixpath.split(path)
@@ -259,8 +263,7 @@ def validate_name(name):
     :return: True if name is correct
     :rtype: bool
     """
-    import re
-    if re.match("^[\w]+$", name):
+    if _name_regex.match(name):
         return True   # No match
     return False
 
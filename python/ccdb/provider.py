@@ -6,7 +6,9 @@ More details.
 
 import re
 import os
+import time
 import logging
+from collections import defaultdict, deque
 from .model import CcdbSchemaVersion
 from . import path_utils
 from datetime import datetime
@@ -14,8 +16,9 @@ from datetime import datetime
 import sqlalchemy
 from sqlalchemy.exc import OperationalError
 import sqlalchemy.orm
+from sqlalchemy.orm import subqueryload, joinedload, contains_eager
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.sql.expression import desc
+from sqlalchemy.sql.expression import desc, func
 from .model import Directory, TypeTable, TypeTableColumn, ConstantSet, Assignment, RunRange, Variation, User, LogRecord
 from .errors import DirectoryNotFound, TypeTableNotFound, RunRangeNotFound, AnonymousUserForbiddenError, DatabaseStructureError, \
     UserNotFoundError, UserExistsError, \
@@ -28,6 +31,20 @@ import posixpath
 
 log = logging.getLogger("ccdb.provider")
 
+# matches characters that should be escaped in SQL LIKE ('_', '%', '\\') and wildcards '*', '?'
+_like_regex = re.compile(r'([_%\\])|(\*)|(\?)')
+
+
+def _to_like(pattern):
+    """
+    Converts search pattern with wildcards '*' and '?' to SQL LIKE pattern with '\\' as escape character
+
+    :param pattern: Search pattern. May contain wildcards '*' and '?'
+    :type pattern: str
+    :rtype: str
+    """
+    return _like_regex.sub(lambda m: '\\' + m.group(1) if m.group(1) else ('%' if m.group(2) else '_'), pattern)
+
 
 class AlchemyProvider(object):
     """
@@ -41,13 +58,16 @@ class AlchemyProvider(object):
     def __init__(self):
         self._is_connected = False
         self._are_dirs_loaded = False
+        self._dirs_loaded_time = 0
+        self.dirs_ttl = None   # seconds before directories are reloaded from DB. None - never reload
         self.dirs_by_id = {}
         self.dirs_by_path = {}
+        self._variations_by_name = {}
+        self._type_tables_by_path = {}
         self.root_dir = Directory()
         self.root_dir.path = '/'
         self.root_dir.name = ''
         self.root_dir.id = 0
-        self.path_name_regex = re.compile('^[\w\-_]+$', re.IGNORECASE)
         self._connection_string = ""
         self._auth = Authentication(self)
         self._auth.current_user_name = "anonymous"
@@ -75,14 +95,18 @@ class AlchemyProvider(object):
         :param connection_string: connection string
         :type connection_string: str
         """
+        #MySQL drops connections that are idle longer than wait_timeout, so long running processes
+        #get 'MySQL server has gone away' on the next query. Recycle pooled connections before that
+        engine_options = {"pool_recycle": 3600} if connection_string.startswith("mysql") else {}
+
         try:
-            self.engine = sqlalchemy.create_engine(connection_string)
+            self.engine = sqlalchemy.create_engine(connection_string, **engine_options)
         except ImportError as err:
             #sql alchemy uses MySQLdb by default. But it might not be installed in the system
             #in such case we fallback to mysqlconnector which is included in CCDB
             if connection_string.startswith("mysql://") and "No module named MySQLdb" in repr(err):
                 connection_string = connection_string.replace("mysql://", "mysql+mysqlconnector://")
-                self.engine = sqlalchemy.create_engine(connection_string)
+                self.engine = sqlalchemy.create_engine(connection_string, **engine_options)
             else:
                 raise
 
@@ -94,6 +118,8 @@ class AlchemyProvider(object):
 
         #since it is a new connection we need to rebuild directories
         self._are_dirs_loaded = False
+        self._variations_by_name = {}
+        self._type_tables_by_path = {}
 
         #check data schema version
         try:
@@ -165,12 +191,12 @@ class AlchemyProvider(object):
         """
         self._ensure_dirs_loaded()
 
-        #we don't have this directory
-        if not path in self.dirs_by_path.keys():
+        try:
+            return self.dirs_by_path[path]
+        except KeyError:
+            #we don't have this directory
             raise DirectoryNotFound("Can't find the directory with path '{0}'".format(path))
 
-        return self.dirs_by_path[path]
-
 
     # ------------------------------------------------
     # return reference to root directory
@@ -218,7 +244,7 @@ class AlchemyProvider(object):
 
         self._ensure_dirs_loaded()
 
-        searchPattern = searchPattern.replace("_", "\\_").replace("*", "%").replace("?", "_")
+        searchPattern = _to_like(searchPattern)
 
         query = self.session.query(Directory).filter(Directory.name.like(searchPattern, escape="\\"))
 
@@ -255,15 +281,11 @@ class AlchemyProvider(object):
         self._ensure_dirs_loaded()
 
         #get parent directory
-        if isinstance(parent_dir_or_path, str):
-            parent_dir = self.dirs_by_path[parent_dir_or_path]
-        else:
-            assert (isinstance(parent_dir_or_path, Directory))
-            parent_dir = parent_dir_or_path
+        parent_dir = self._resolve_dir(parent_dir_or_path)
 
         #check if no such directory exists
         new_full_path = posixpath.join(parent_dir.path, new_dir_name)
-        if new_full_path in self.dirs_by_path.keys():
+        if new_full_path in self.dirs_by_path:
             raise ValueError("The directory with path '{0}' already exist".format(new_full_path))
 
         #Get user
@@ -288,7 +310,12 @@ class AlchemyProvider(object):
 
             #add to database
             self.session.add(directory)
-            self.session.commit()
+            self._commit_directories()
+
+            #add the new directory to the loaded structure instead of reloading all directories
+            directory.path = new_full_path
+            self.dirs_by_id[directory.id] = directory
+            self.dirs_by_path[directory.path] = directory
 
             #add log
             self.create_log_record(user=user,
@@ -297,17 +324,13 @@ class AlchemyProvider(object):
                                    description="Created directory '{0}'".format(new_full_path),
                                    comment=directory.comment)
 
-            #refresh directory structure
-            self._load_dirs()
-
             return directory
 
     ## @brief Updates directory
     #
     # @warning in current realization, if operation succeeded
-    # the directories structure will be rebuilt. This mean that
-    # (!) all previous pointers to DDirectory objects except Root Directory
-    # will become deleted => unusable
+    # the directories paths will be rebuilt from already loaded
+    # directories. Directory objects stay the same and remain usable
     #
     # @param [in] ccdb.Directory object - Directory to update
     # @return bool True if success
@@ -319,18 +342,19 @@ class AlchemyProvider(object):
         #get user or get user error if there is no user
         user = self.get_current_user()
 
-        self.session.commit()
+        self._commit_directories()
+
+        #name or parent might be changed, so rebuild paths. The commit expired all directories, so they are
+        #reloaded by one query (the same objects are refreshed) instead of a refresh query per directory
+        self._load_dirs()
 
         #Log
         self.create_log_record(user,
-                               affected_ids=[directory.__tablename__ + directory(directory.id)],
+                               affected_ids=[directory.__tablename__ + str(directory.id)],
                                action="update",
                                description="Updated directory '{0}'".format(directory.path),
                                comment=directory.comment)
 
-        #refresh directory structure
-        self._load_dirs()
-
     # ------------------------------------------------
     # Deletes directory using path or Directory obj
     # ------------------------------------------------
@@ -348,12 +372,8 @@ class AlchemyProvider(object):
         #get user here to fail if no such user
         user = self.get_current_user()
 
-        #check the type
-        if isinstance(dir_or_path, str):
-            directory = self.get_directory(dir_or_path)
-        else:
-            assert (isinstance(dir_or_path, Directory))
-            directory = dir_or_path
+        #get the directory
+        directory = self._resolve_dir(dir_or_path)
 
         if len(directory.sub_dirs) != 0 or len(directory.type_tables) != 0:
             err_message = "Directory '{0}' contains {1} subdirectories and {2} tables." + \
@@ -362,10 +382,13 @@ class AlchemyProvider(object):
             raise ValueError(err_message)
 
         self.session.delete(directory)
-        self.session.commit()
+        self._commit_directories()
 
-        # refresh directory structure
-        self._load_dirs()
+        # remove the directory from the loaded structure
+        self.dirs_by_id.pop(directory.id, None)
+        self.dirs_by_path.pop(directory.path, None)
+        if directory.parent_dir is not None and directory in directory.parent_dir.sub_dirs:
+            directory.parent_dir.sub_dirs.remove(directory)
 
         #Log
         self.create_log_record(user,
@@ -380,17 +403,23 @@ class AlchemyProvider(object):
     # ------------------------------------------------
     def _load_dirs(self):
         try:
-            self.dirs_by_id = self._get_dirs_by_id_dic(self.session.query(Directory).all())
+            # iterate the query directly, so no intermediate list of all directories is built.
+            # populate_existing re-reads directories which are already in the session,
+            # so changes made by other clients (renames, moves) are seen on reload
+            query = self.session.query(Directory).populate_existing()
+            self.dirs_by_id = self._get_dirs_by_id_dic(query)
         except OperationalError as err:
             if 'no such table' in err.message:
-                import os
-
                 raise DatabaseStructureError(self._no_structure_message.format(err))
             else:
                 raise
 
         self.dirs_by_path = self._structure_dirs(self.dirs_by_id)
         self._are_dirs_loaded = True
+        self._dirs_loaded_time = time.time()
+
+        # directory paths might be changed, so tables are looked up by path again
+        self._type_tables_by_path = {}
 
     # ------------------------------------------------
     # Structure directories by hierarchy
@@ -404,29 +433,28 @@ class AlchemyProvider(object):
         #clear the full path dictionary
         dirs_by_full_path = {self.root_dir.path: self.root_dir}
 
-        #clear subdirectories to append them from the beginning in the next step
-        for directory in directories.values():
-            directory.sub_dirs = []
-
         # root dir is artificial (not from database).
         # have to clear it
         self.root_dir.sub_dirs = []
 
-        #begin loop through the directories
+        #group directories by parent id, directories without parent belong to the root (id=0).
+        #subdirectories are cleared here to append them from the beginning in the next step
+        dirs_by_parent_id = defaultdict(list)
         for directory in directories.values():
-            assert (isinstance(directory, Directory))
-
-            parent_dir = self.root_dir
-
-            # and check if it have parent directory
-            if directory.parent_id > 0:
-                #this directory must have a parent! so now search it
-                parent_dir = directories[directory.parent_id]
-
-            parent_dir.sub_dirs.append(directory)
-            directory.path = posixpath.join(parent_dir.path, directory.name)
-            directory.parent_dir = parent_dir
-            dirs_by_full_path[directory.path] = directory
+            directory.sub_dirs = []
+            dirs_by_parent_id[directory.parent_id if directory.parent_id > 0 else 0].append(directory)
+
+        #go from the root to leaves, so the parent path is always built before its children paths
+        parents = deque([self.root_dir])
+        while parents:
+            parent_dir = parents.popleft()
+            parent_path = parent_dir.path.rstrip('/') + '/'
+            for directory in dirs_by_parent_id.get(parent_dir.id, ()):
+                parent_dir.sub_dirs.append(directory)
+                directory.path = parent_path + directory.name
+                directory.parent_dir = parent_dir
+                dirs_by_full_path[directory.path] = directory
+                parents.append(directory)
 
         return dirs_by_full_path
 
@@ -436,12 +464,7 @@ class AlchemyProvider(object):
     # create dictionary by directory id
     # ------------------------------------------------
     def _get_dirs_by_id_dic(self, dirs):
-        result = {}
-        for directory in dirs:
-            assert (isinstance(directory, Directory))
-            result[directory.id] = directory
-
-        return result
+        return {directory.id: directory for directory in dirs}
 
     # ------------------------------------------------
     # Checks that directory structure is loaded
@@ -450,6 +473,40 @@ class AlchemyProvider(object):
     def _ensure_dirs_loaded(self):
         if not self._are_dirs_loaded:
             self._load_dirs()
+        elif self.dirs_ttl is not None and time.time() - self._dirs_loaded_time > self.dirs_ttl:
+            self._load_dirs()
+
+    # ------------------------------------------------
+    # Gets directory by path or returns the Directory
+    # ------------------------------------------------
+    def _resolve_dir(self, dir_obj_or_path):
+        if isinstance(dir_obj_or_path, str):
+            return self.get_directory(dir_obj_or_path)
+        return dir_obj_or_path
+
+    # ------------------------------------------------
+    # Reloads directories from database
+    # ------------------------------------------------
+    def refresh_directories(self):
+        """
+        Reloads directories structure from database
+
+        Directories are loaded once and then are updated by this provider changes only.
+        Call this function if directories could be changed by other clients
+        """
+        self._load_dirs()
+
+    # ------------------------------------------------
+    # Commits changes of directories. If commit fails
+    # the loaded structure is marked to be reloaded
+    # ------------------------------------------------
+    def _commit_directories(self):
+        try:
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            self._are_dirs_loaded = False
+            raise
 
 
     # ----------------------------------------------------------------------------------------
@@ -470,11 +527,19 @@ class AlchemyProvider(object):
         """
         self._ensure_dirs_loaded()  # even with self.get_directory do not remove it
 
+        # tables are requested by path over and over (i.e. for each run), so they are cached.
+        # After commit the cached table is expired and it is cheaper to query it again with columns
+        table = self._type_tables_by_path.get(exact_path)
+        if table is not None and not sqlalchemy.inspect(table).expired_attributes:
+            return table
+
         parent_dir_path = posixpath.dirname(exact_path)
         table_name = posixpath.basename(exact_path)
         parent_dir = self.get_directory(parent_dir_path)
 
-        query = self.session.query(TypeTable).filter(TypeTable.name == table_name,
+        # columns are almost always used with the table, so load them in the same query
+        query = self.session.query(TypeTable).options(joinedload(TypeTable.columns))\
+                                             .filter(TypeTable.name == table_name,
                                                      TypeTable.parent_dir_id == parent_dir.id)
 
         try:
@@ -483,6 +548,7 @@ class AlchemyProvider(object):
             message = "No type table found by exact path: '{0}'".format(exact_path)
             raise TypeTableNotFound(message)
 
+        self._type_tables_by_path[exact_path] = table
         return table
 
 
@@ -500,13 +566,11 @@ class AlchemyProvider(object):
         """
         self._ensure_dirs_loaded()
 
-        if isinstance(dir_obj_or_path, str):
-            parent_dir = self.get_directory(dir_obj_or_path)
-        else:
-            assert isinstance(dir_obj_or_path, Directory)
-            parent_dir = dir_obj_or_path
+        parent_dir = self._resolve_dir(dir_obj_or_path)
 
-        return self.session.query(TypeTable).filter(TypeTable.parent_dir_id == parent_dir.id).all()
+        # load columns of all tables by one more query (instead of a query per table)
+        return self.session.query(TypeTable).options(subqueryload(TypeTable.columns))\
+                                            .filter(TypeTable.parent_dir_id == parent_dir.id).all()
 
 
     # ------------------------------------------------
@@ -541,21 +605,15 @@ class AlchemyProvider(object):
         self._ensure_dirs_loaded()
 
         #prepare search pattern for SQL
-        pattern = pattern.replace("_", "\\_").replace("*", "%").replace("?", "_")
+        pattern = _to_like(pattern)
 
         #initial query
         query = self.session.query(TypeTable).filter(TypeTable.name.like(pattern, escape="\\"))
 
-        #does parent directory specified?
+        #does parent directory specified? (empty path means search through all type tables)
         parent_dir = None
-        if dir_obj_or_path is not None:
-            self._ensure_dirs_loaded()
-
-            if isinstance(dir_obj_or_path, str) and dir_obj_or_path != "":
-                parent_dir = self.get_directory(dir_obj_or_path)
-            else:
-                assert isinstance(dir_obj_or_path, Directory)
-                parent_dir = dir_obj_or_path
+        if dir_obj_or_path is not None and dir_obj_or_path != "":
+            parent_dir = self._resolve_dir(dir_obj_or_path)
 
         #add parent directory to query
         if parent_dir is not None:
@@ -584,13 +642,10 @@ class AlchemyProvider(object):
 
         self._ensure_dirs_loaded()
 
-        if isinstance(dir_obj_or_path, str):
-            parent_dir = self.get_directory(dir_obj_or_path)
-        else:
-            assert isinstance(dir_obj_or_path, Directory)
-            parent_dir = dir_obj_or_path
+        parent_dir = self._resolve_dir(dir_obj_or_path)
 
-        return self.session.query(TypeTable).filter(TypeTable.parent_dir_id == parent_dir.id).count()
+        # plain SELECT COUNT(id) ... without the subquery that Query.count() wraps around
+        return self.session.query(func.count(TypeTable.id)).filter(TypeTable.parent_dir_id == parent_dir.id).scalar()
 
     # --------------------------------------------------
     # Creates constant table in database
@@ -625,16 +680,12 @@ class AlchemyProvider(object):
 
         self._ensure_dirs_loaded()
 
-        if isinstance(dir_obj_or_path, str):
-            parent_dir = self.get_directory(dir_obj_or_path)
-        else:
-            assert isinstance(dir_obj_or_path, Directory)
-            parent_dir = dir_obj_or_path
+        parent_dir = self._resolve_dir(dir_obj_or_path)
 
         # check, if the table already exists
-        data_count = self.session.query(TypeTable).filter(TypeTable.parent_dir_id == parent_dir.id).filter(
-            TypeTable.name == name).count()
-        if data_count > 0:
+        query = self.session.query(TypeTable).filter(TypeTable.parent_dir_id == parent_dir.id).filter(
+            TypeTable.name == name)
+        if self.session.query(query.exists()).scalar():
             message = "Can't create a type table. Such table already exists in this directory"
             raise ValueError(message)
 
@@ -653,17 +704,16 @@ class AlchemyProvider(object):
             table.parent_dir_id = parent_dir.id
             table.author_id = user.id
 
-            for i, (name, col_type) in enumerate(columns):
-                column = TypeTableColumn()
-                column.name = name
-                column.order = i
-                col_type = col_type or 'double'
-                column.type = col_type
-                table.columns.append(column)
-
             table._columns_count = len(columns)
 
+            # flush the table to get its id for the columns
             self.session.add(table)
+            self.session.flush()
+
+            # columns are inserted all together by one executemany statement
+            table_columns = [TypeTableColumn(name=col_name, order=i, type=col_type or 'double', type_table_id=table.id)
+                             for i, (col_name, col_type) in enumerate(columns)]
+            self.session.bulk_save_objects(table_columns)
             self.session.commit()
 
             #add log
@@ -685,6 +735,9 @@ class AlchemyProvider(object):
 
         self.session.commit()
 
+        # the name or directory might be changed
+        self._type_tables_by_path = {}
+
         #Log
         self.create_log_record(user=user,
                                affected_ids=[type_table.__tablename__ + str(type_table.id)],
@@ -711,15 +764,16 @@ class AlchemyProvider(object):
         # get user here to fail if no such user
         user = self.get_current_user()
 
-        data_count = self.session.query(ConstantSet).filter(ConstantSet.type_table_id == type_table.id).count()
-        if data_count > 0:
-            message = ("Can't delete type table that has data assigned to it."
-                       + "The type table '{0}' with id '{1}'. It has {2} data sets which reference it."
-                       + "Please, delete the data first").format(type_table.path, type_table.id, data_count)
+        query = self.session.query(ConstantSet).filter(ConstantSet.type_table_id == type_table.id)
+        if self.session.query(query.exists()).scalar():
+            message = ("Can't delete type table that has data assigned to it. "
+                       "The type table '{0}' with id '{1}' has data sets which reference it. "
+                       "Please, delete the data first").format(type_table.path, type_table.id)
             raise ValueError(message)
 
         self.session.delete(type_table)
         self.session.commit()
+        self._type_tables_by_path.pop(type_table.path, None)
 
         # Log
         self.create_log_record(user=user,
@@ -738,10 +792,11 @@ class AlchemyProvider(object):
         if name:
             return self.get_named_run_range(name)
 
-        try:
-            return self.session.query(RunRange).filter(RunRange.min == min_run).filter(RunRange.max == max_run).one()
-        except sqlalchemy.orm.exc.NoResultFound:
+        # first() adds LIMIT 1, while one() fetches more rows to check that the result is unique
+        run_range = self.session.query(RunRange).filter(RunRange.min == min_run).filter(RunRange.max == max_run).first()
+        if run_range is None:
             raise RunRangeNotFound("Run range '{0}-{1}' is not found".format(min_run, max_run))
+        return run_range
 
     # ------------------------------------------------
     # GetRun Range from db by name
@@ -753,15 +808,14 @@ class AlchemyProvider(object):
         :param name:
         :return:
         """
-        try:
-            return self.session.query(RunRange).filter(RunRange.name == name).one()
-        except sqlalchemy.orm.exc.NoResultFound:
+        run_range = self.session.query(RunRange).filter(RunRange.name == name).first()
+        if run_range is None:
             raise RunRangeNotFound("Run range with name '{0}' is not found".format(name))
+        return run_range
 
     # ------------------------------------------------
     # Gets run range from DB Or Creates RunRange in DB
     # ------------------------------------------------
-    # noinspection PyBroadException
     def get_or_create_run_range(self, min_run, max_run, name="", comment=""):
         """
         Gets run range from DB Or Creates RunRange in DB
@@ -775,9 +829,8 @@ class AlchemyProvider(object):
         """
 
         try:
-            run_range = self.get_run_range(min_run, max_run, name)
-            return run_range
-        except:
+            return self.get_run_range(min_run, max_run, name)
+        except RunRangeNotFound:
             pass
 
         # if we here we was unable to find a run range
@@ -811,16 +864,15 @@ class AlchemyProvider(object):
         :param run_range: RunRange object to delete
         :return: None
         """
-        data_count = self.session.query(Assignment).filter(Assignment.run_range_id == run_range.id).count()
-        if data_count > 0:
-            message = ("Can't delete run range that has data assigned to it."
-                       "The run range with id '{0}', name '{2}' [{3} - {4}] has {5} data sets which reference it."
+        query = self.session.query(Assignment).filter(Assignment.run_range_id == run_range.id)
+        if self.session.query(query.exists()).scalar():
+            message = ("Can't delete run range that has data assigned to it. "
+                       "The run range with id '{0}', name '{1}' [{2} - {3}] has data sets which reference it. "
                        "Please, delete the data first"). \
                 format(run_range.id,
                        run_range.name,
                        run_range.min,
-                       run_range.max,
-                       data_count)
+                       run_range.max)
             raise ValueError(message)
 
         self.session.delete(run_range)
@@ -840,12 +892,20 @@ class AlchemyProvider(object):
         :return: Variation object
         :rtype: Variation
         """
+        # variations are requested by name over and over (i.e. for each assignment), so they are cached
         try:
-            return self.session.query(Variation).filter(Variation.name == name).one()
-        except NoResultFound:
+            return self._variations_by_name[name]
+        except KeyError:
+            pass
+
+        variation = self.session.query(Variation).filter(Variation.name == name).first()
+        if variation is None:
             message = "No variation found with name: '{0}'".format(name)
             raise VariationNotFound(message)
 
+        self._variations_by_name[name] = variation
+        return variation
+
     # -------------------------------------------------------
     # Searches all variations associated with this type table
     # -------------------------------------------------------
@@ -863,7 +923,7 @@ class AlchemyProvider(object):
 
         if len(pattern):
             # prepare search pattern for SQL
-            pattern = pattern.replace("_", "\\_").replace("*", "%").replace("?", "_")
+            pattern = _to_like(pattern)
             query = query.filter(Variation.name.like(pattern, escape="\\"))
 
         return query.all()
@@ -899,13 +959,13 @@ class AlchemyProvider(object):
             .filter(TypeTable.id == table.id)
         if run >= 0:
             query = query.filter(RunRange.min <= run).filter(RunRange.max >= run)
+        if name and len(name):
+            name = _to_like(name)
+            query = query.filter(Variation.name.like(name, escape="\\"))
         if limit > 0:
             query = query.limit(limit)
         if offset > 0:
             query = query.offset(offset)
-        if name and len(name):
-            name = name.replace("_", "\\_").replace("*", "%").replace("?", "_")
-            query = self.session.query(Variation).filter(Variation.name.like(name, escape="\\"))
 
         return query.all()
 
@@ -932,7 +992,8 @@ class AlchemyProvider(object):
 
             variation = Variation()
 
-            if self.session.query(Variation).filter(Variation.name == name).count() > 0:
+            query = self.session.query(Variation).filter(Variation.name == name)
+            if name in self._variations_by_name or self.session.query(query.exists()).scalar():
                 raise ValueError("Cannot create a new variation with name {0}. "
                                  "Variation with that name already exists".format(name))
 
@@ -945,6 +1006,7 @@ class AlchemyProvider(object):
             variation.author_id = user.id
             self.session.add(variation)
             self.session.commit()
+            self._variations_by_name[name] = variation
 
             # add log
             self.create_log_record(user=user,
@@ -973,6 +1035,10 @@ class AlchemyProvider(object):
         user = self.get_current_user()
 
         self.session.commit()
+
+        # the name might be changed
+        self._variations_by_name = {}
+
         # Log
         self.create_log_record(user=user,
                                affected_ids=[variation.__tablename__ + str(variation.id)],
@@ -995,15 +1061,16 @@ class AlchemyProvider(object):
         # get user here to fail if no such user
         user = self.get_current_user()
 
-        data_count = self.session.query(Assignment).filter(Assignment.variation_id == variation.id).count()
-        if data_count > 0:
+        query = self.session.query(Assignment).filter(Assignment.variation_id == variation.id)
+        if self.session.query(query.exists()).scalar():
             message = ("Can't delete variation that has data assigned to it. "
-                       "The variation '{0}' with id '{1}' has {2} data sets which reference it."
-                       "Please, delete the data first").format(variation.name, variation.id, data_count)
+                       "The variation '{0}' with id '{1}' has data sets which reference it. "
+                       "Please, delete the data first").format(variation.name, variation.id)
             raise ValueError(message)
 
         self.session.delete(variation)
         self.session.commit()
+        self._variations_by_name.pop(variation.name, None)
         #Log
         self.create_log_record(user=user,
                                affected_ids=[variation.__tablename__ + str(variation.id)],
@@ -1046,21 +1113,27 @@ class AlchemyProvider(object):
             assert isinstance(variation, Variation)
             variation_name = variation.name
 
-        query = self.session.query(Assignment) \
-            .join(ConstantSet).join(TypeTable).join(RunRange).join(Variation) \
+        # the latest assignment is the one with the biggest id
+        latest_id_query = self.session.query(func.max(Assignment.id)).select_from(Assignment) \
+            .join(ConstantSet).join(RunRange).join(Variation) \
             .filter(Variation.name == variation_name) \
-            .filter(TypeTable.id == table.id)\
+            .filter(ConstantSet.type_table_id == table.id) \
             .filter(RunRange.min <= run).filter(RunRange.max >= run)
 
         # filter by date and time
         if date_and_time is not None:
             assert isinstance(date_and_time, datetime)
-            query = query.filter(Assignment.created <= date_and_time)
+            latest_id_query = latest_id_query.filter(Assignment.created <= date_and_time)
 
-        query = query.order_by(desc(Assignment.id))
+        # fetch the assignment together with objects that are used with it
+        query = self.session.query(Assignment) \
+            .options(joinedload(Assignment.constant_set),
+                     joinedload(Assignment.run_range),
+                     joinedload(Assignment.variation)) \
+            .filter(Assignment.id == latest_id_query.as_scalar())
 
         try:
-            return query.limit(1).one()
+            return query.one()
         except NoResultFound:
 
             # Check if should try the same with parent variation
@@ -1125,10 +1198,12 @@ class AlchemyProvider(object):
             assert isinstance(path_or_table, TypeTable)
             table = path_or_table
 
-        # build query
+        # build query. run ranges and variations are joined anyway, so they are loaded from the same rows
+        # instead of lazy loading them for each returned assignment
         query = self.session.query(Assignment) \
-            .join(ConstantSet).join(TypeTable).join(RunRange).join(Variation) \
-            .filter(TypeTable.id == table.id)
+            .join(ConstantSet).join(RunRange).join(Variation) \
+            .options(contains_eager(Assignment.run_range), contains_eager(Assignment.variation)) \
+            .filter(ConstantSet.type_table_id == table.id)
 
         # filter variation
         if isinstance(variation, str):
@@ -1216,11 +1291,16 @@ class AlchemyProvider(object):
                       "".format(data_rows_count, data_cols_count, table.rows_count, table._columns_count)
             raise ValueError(message)
 
-        # check for type
+        # check for type. Columns are taken once for all rows, 'string' columns accept any value
+        checked_columns = [(column_index, column) for column_index, column in enumerate(table.columns)
+                           if column.type != 'string']
         for row_index, row in enumerate(rows):
-            for column_index, cell in enumerate(row):
-                column = table.columns[column_index]
-                self.validate_data_value(cell, column, column_index, row_index)
+            if len(row) != data_cols_count:
+                message = "Data row '{0}' has '{1}' values while table declared columns='{2}'" \
+                          "".format(row_index, len(row), data_cols_count)
+                raise ValueError(message)
+            for column_index, column in checked_columns:
+                self.validate_data_value(row[column_index], column, column_index, row_index)
 
         # Get user
         user = self.get_current_user()
@@ -1256,19 +1336,36 @@ class AlchemyProvider(object):
     # updates assignment comments
     # ------------------------------------------------
     def update_assignment(self, assignment):
+        """
+        Saves changes of the assignment
+
+        :param assignment: changed assignment object
+        """
+        self.update_assignments([assignment])
+
+    # ------------------------------------------------
+    # updates assignments comments
+    # ------------------------------------------------
+    def update_assignments(self, assignments):
+        """
+        Saves changes of many assignments. Changes and log records are committed once for all of them
+
+        :param assignments: list of changed assignment objects
+        :type assignments: list
+        """
 
         # get user here to fail if no such user
         user = self.get_current_user()
 
+        for assignment in assignments:
+            self.session.add(assignment)
+            self._add_log_record(user=user,
+                                 affected_ids=[assignment.__tablename__ + str(assignment.id)],
+                                 action="update",
+                                 description="Updated assignment '{0}'".format(assignment.request),
+                                 comment=assignment.comment)
         self.session.commit()
 
-        # Log
-        self.create_log_record(user=user,
-                               affected_ids=[assignment.__tablename__ + str(assignment.id)],
-                               action="update",
-                               description="Updated assignment '{0}'".format(assignment.request),
-                               comment=assignment.comment)
-
     # ------------------------------------------------
     # Deletes assignment
     # ------------------------------------------------
@@ -1278,21 +1375,31 @@ class AlchemyProvider(object):
 
         :param assignment: assignment object to delete. Must have valid ID
         """
+        self.delete_assignments([assignment])
+
+    # ------------------------------------------------
+    # Deletes assignments
+    # ------------------------------------------------
+    def delete_assignments(self, assignments):
+        """
+        Deletes many assignments. Deletion and log records are committed once for all of them
+
+        :param assignments: list of assignment objects to delete. Must have valid IDs
+        :type assignments: list
+        """
 
-        # save assignment parameters
         user = self.get_current_user()
-        affected_ids = [assignment.__tablename__ + str(assignment.id)]
-        action = "delete"
-        description = "Deleted assignment '{0}'".format(assignment.request)
-        comment = assignment.comment
 
-        # delete it
-        self.session.delete(assignment)
+        for assignment in assignments:
+            # log record is made from assignment parameters, so it goes before the deletion
+            self._add_log_record(user=user,
+                                 affected_ids=[assignment.__tablename__ + str(assignment.id)],
+                                 action="delete",
+                                 description="Deleted assignment '{0}'".format(assignment.request),
+                                 comment=assignment.comment)
+            self.session.delete(assignment)
         self.session.commit()
 
-        # Log
-        self.create_log_record(user, affected_ids, action, description, comment)
-
     # ------------------------------------------------
     # validate value
     # ------------------------------------------------
@@ -1498,6 +1605,13 @@ class AlchemyProvider(object):
     #   L O G G I N G
     # ----------------------------------------------------------------------------------------
     def create_log_record(self, user, affected_ids, action, description, comment):
+        record = self._add_log_record(user, affected_ids, action, description, comment)
+        if record is not None:
+            self.session.commit()
+        return record
+
+    def _add_log_record(self, user, affected_ids, action, description, comment):
+        """Adds log record to the session without commit, so it is saved with the caller changes"""
         if not self.logging_enabled:
             return None
 
@@ -1514,7 +1628,6 @@ class AlchemyProvider(object):
         user.last_action_time = datetime.now()
 
         self.session.add(record)
-        self.session.commit()
         return record
 
 
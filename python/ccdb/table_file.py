@@ -10,6 +10,21 @@ META_CREATED = 'created'
 META_RUN_RANGE = 'run range'
 META_AUTHOR = 'author'
 
+# characters that make shlex.split different from plain whitespace split
+_shlex_special_chars = ('"', "'", '\\')
+
+
+def _split_line(line):
+    """Splits data line to tokens. Quotes and escapes are processed as shlex does
+
+    shlex is pure python and goes char by char, so it is used only if the line has quotes or escapes.
+    Numeric calibration data (which is the most of data) is split by str.split
+    """
+    for char in _shlex_special_chars:
+        if char in line:
+            return shlex.split(line)
+    return line.split()
+
 
 # *********************************************************************
 #   Class TextFileDOM - store information of text data files         *
@@ -97,14 +112,14 @@ def read_ccdb_text_file(file_name):
 
                 elif line.startswith('#&'):  # comment with column names
                     line = line[2:].strip()
-                    dom.column_names = shlex.split(line)
+                    dom.column_names = _split_line(line)
 
                 elif line.startswith("#"):  # comment
                     line = line[1:]
                     dom.comment_lines.append(line)
 
                 else:  # string with data?
-                    tokens = shlex.split(line)
+                    tokens = _split_line(line)
                     values = []
                     for token in tokens:
                         if token.startswith("#"):  # stop loop if the comment is met
@@ -151,12 +166,11 @@ def read_namevalue_text_file(file_name, replace_c_comments=False):
                     dom.comment_lines.append(line)
 
                 else:  # string with data?
-                    tokens = shlex.split(line)
+                    tokens = _split_line(line)
 
                     # check we have name and value
                     if len(tokens) < 2:
-                        print("ERROR. The name-value file have less than 2 columns. So where are names and values?")
-                        raise IOError()
+                        raise IOError("The name-value file have less than 2 columns. So where are names and values?")
                     values.append(tokens[1])
                     dom.column_names.append(tokens[0])
 
@@ -5,6 +5,7 @@ from ccdb.model import gen_flatten_data, list_to_blob, blob_to_list, list_to_tab
 from ccdb.model import LogRecord, User
 from ccdb.errors import DatabaseStructureError, TypeTableNotFound, DirectoryNotFound, \
     UserNotFoundError, VariationNotFound, RunRangeNotFound
+from sqlalchemy.orm.exc import NoResultFound
 
 from ccdb import AlchemyProvider
 from tests import helper
@@ -101,6 +102,27 @@ class AlchemyProviderTest(unittest.TestCase):
         # create another subdirectory
         variables_subdir = self.provider.create_directory("variables", "/test/testdir", "My constants")
 
+        # directory renamed by another client is found by the new path after refresh
+        other_provider = AlchemyProvider()
+        other_provider.logging_enabled = False
+        other_provider.authentication.current_user_name = "test_user"
+        other_provider.connect(self.connection_str)
+        other_variables_subdir = other_provider.get_directory("/test/testdir/variables")
+        other_variables_subdir.name = "other_variables"
+        other_provider.update_directory(other_variables_subdir)
+        other_provider.disconnect()
+
+        self.provider.refresh_directories()
+        self.assertIs(self.provider.get_directory("/test/testdir/other_variables"), variables_subdir)
+        self.assertRaises(DirectoryNotFound, self.provider.get_directory, "/test/testdir/variables")
+
+        # test update (rename)
+        variables_subdir.name = "renamed_variables"
+        self.provider.update_directory(variables_subdir)
+        self.assertIs(self.provider.get_directory("/test/testdir/renamed_variables"), variables_subdir)
+        self.assertEqual(variables_subdir.path, "/test/testdir/renamed_variables")
+        self.assertRaises(DirectoryNotFound, self.provider.get_directory, "/test/testdir/other_variables")
+
         # test delete
         self.provider.delete_directory("/test/testdir/constants")
 
@@ -247,6 +269,13 @@ class AlchemyProviderTest(unittest.TestCase):
         vs = self.provider.search_variations(table)
         self.assertIsNotNone(vs)
         self.assertNotEquals(len(vs), 0)
+        self.assertIn("default", [var.name for var in vs])
+
+        # Filter them by name. 'default' has data for the table, but doesn't match the pattern
+        vs = self.provider.search_variations(table, name="sub*")
+        var_names = [var.name for var in vs]
+        self.assertIn("subtest", var_names)
+        self.assertNotIn("default", var_names)
 
         # Get variations by name
         vs = self.provider.get_variations("def*")
@@ -347,6 +376,24 @@ class AlchemyProviderTest(unittest.TestCase):
 
         self.provider.delete_assignment(assignment)
 
+        # all rows must have the same number of values as the table has columns
+        for bad_rows in ([[0, 1, 2], [3, 4, 5, 6]], [[0, 1, 2], [3, 4]]):
+            self.assertRaises(ValueError, self.provider.create_assignment, bad_rows, "/test/test_vars/test_table",
+                              0, 1000, "default", "Test assignment")
+
+        # update and delete several assignments at once
+        assignments = [self.provider.create_assignment([[0, 1, 2], [3, 4, 5]], "/test/test_vars/test_table", 0, 1000,
+                                                       "default", "Test assignment") for _ in range(2)]
+        for assignment in assignments:
+            assignment.comment = "Updated assignment"
+        self.provider.update_assignments(assignments)
+        assignment_ids = [assignment.id for assignment in assignments]
+        self.assertEqual(self.provider.get_assignment_by_id(assignment_ids[1]).comment, "Updated assignment")
+
+        self.provider.delete_assignments(assignments)
+        for assignment_id in assignment_ids:
+            self.assertRaises(NoResultFound, self.provider.get_assignment_by_id, assignment_id)
+
     def test_users(self):
         """Test users"""
         self.provider.connect(self.connection_str)   # this test requires the connection
@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import ccdb
+
+
+class TextFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_file(self, text):
+        file_name = os.path.join(self.temp_dir, "data.txt")
+        with open(file_name, "w") as f:
+            f.write(text)
+        return file_name
+
+    def test_read_namevalue(self):
+        file_name = self.write_file("#comment\n"
+                                    "  x   1.5  \n"
+                                    "\n"
+                                    "y\t2e-3\n"
+                                    "name 'quoted value'\n"
+                                    "// c comment\n")
+        dom = ccdb.read_namevalue_text_file(file_name, True)
+
+        self.assertEqual(dom.column_names, ["x", "y", "name"])
+        self.assertEqual(dom.rows, [["1.5", "2e-3", "quoted value"]])
+        self.assertEqual(dom.comment_lines, ["comment", " c comment"])
+
+    def test_read_namevalue_one_column(self):
+        file_name = self.write_file("x 1\ny\n")
+        self.assertRaises(IOError, ccdb.read_namevalue_text_file, file_name)
+
+    def test_read_ccdb_text_file(self):
+        file_name = self.write_file("#& a b \"c d\"\n"
+                                    "1 2 3 #tail comment\n"
+                                    "4 \"5 5\" 6\n")
+        dom = ccdb.read_ccdb_text_file(file_name)
+
+        self.assertEqual(dom.column_names, ["a", "b", "c d"])
+        self.assertEqual(dom.rows, [["1", "2", "3"], ["4", "5 5", "6"]])
+        self.assertTrue(dom.data_is_consistent)
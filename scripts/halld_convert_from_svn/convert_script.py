@@ -1,121 +1,83 @@
-from xml.dom.minidom import parse, parseString
-from os import environ, path
-from xml.dom import minidom
-import xml.dom.minidom
 import os
 import os.path
-import sys
+import posixpath
+import argparse
+import logging
+import threading
 import ccdb
-import subprocess
-
-dom = xml.dom.minidom.getDOMImplementation();
-#dom = xml.dom.dom()
-print """
-============================
-SVN CALIB to CCDB convertion
-============================
 
-This script aims to convers SVN file based GluEx calibration constats set to CCDB database
-
-Three environment variables must be set:
-CCDB_HOME - ccdb package home dir
-JANA_CALIB_URL - Jana callib url in form of file://path/to/data
-JANA_CALIB_RULES - path to xml files with conversion rules 
-
-run this script with '--rehearsal' flag to see what will be done. 
-run this script with '--execute' flag will execute ccdb commands
-"""
+#C implementation of ElementTree is much faster than minidom. (There is no cElementTree in python 3.9+)
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
 
+log = logging.getLogger("halld_convert_from_svn")
 
-#--------------------------
-#  CONFIGURE  CCDB  PACKAGE 
-#-------------------------- 
+#-----------------------------
+# ***      SETTINGS        ***
+#-----------------------------
+# are set by main()
 
-#ccdb pakage path
-if not "CCDB_HOME" in os.environ:
-    print "CCDB_HOME must be set"
-    exit(1)
+#configure ccdbcmd
+ccdbcmd_opts = ""
 
-ccdb_dir = os.environ['CCDB_HOME']
+#this is directory with calib data
+calib_dir = ""
 
-# configure ccdb package to use
-try:
-    import ccdb
-except:
-    ccdb_python_dir = os.path.join(ccdb_dir, 'python')
-    sys.path.append(ccdb_python_dir)
-    try:
-        import ccdb
-    except:
-        print "Cannot load ccdb python library. Check it is in path"
-        exit(1)
+#this is the directory where xml files with data table definition are located
+rules_xml_dir = ""
 
-#configure ccdbcmd
-ccdbcmd_opts = ""
+execute_ccdb_commands = False
+is_verbose = False
 
+#provider is connected once (only if commands are executed) and is used for all tables and assignments
+provider = None
 
-#--------------------------------------------
-# *** CONFIGURE  SVN CALIBRATION  PACKAGE ***
-#--------------------------------------------
 
-if not "JANA_CALIB_URL" in  os.environ:
-    print "JANA_CALIB_URL must be set"
-    exit(1)
+#comments go to one line: new lines are escaped, double quotes are replaced by single quotes
+#(xml parser already normalizes \r\n to \n). The table is for unicode.translate, so comments are unicode
+comments_translate_table = {ord(u'\n'): u'\\n', ord(u'"'): u"'"}
 
-#this is directory with calib data
-calib_dir = os.environ['JANA_CALIB_URL']
-calib_dir = calib_dir[7:] #skip 'file://' part
 
-#-------------------------------------
-# *** CONFIGURE  CONVERSION RULES  ***
-#-------------------------------------
+#-----------------------------------------------------"
+# DataFileReader
+#-----------------------------------------------------"
+class DataFileReader(threading.Thread):
+    """Reads data file of xml <type> table in background
 
-if not "JANA_CALIB_RULES" in  os.environ:
-    print "JANA_CALIB_RULES must be set"
-    exit(1)
+    While one table is created and filled in the database, the data file of the next table is read from disk
+    """
 
-#this is 'rules dir' the directory where xml files with data table definition are located
-rules_dir = os.environ['JANA_CALIB_RULES']
-rules_xml_dir = os.path.join(rules_dir, 'xml')
+    def __init__(self, xml_table, ccdb_parent_path):
+        threading.Thread.__init__(self)
+        self.daemon = True
 
+        #data files repeat the ccdb tables structure. table path is absolute, so it is not joined
+        table_path = posixpath.join(ccdb_parent_path or "/", xml_table.get('name'))
+        self.data_file_path = calib_dir.rstrip("/") + table_path
+        self.is_name_value_format = bool(int(xml_table.get('namevalue')))
+        self.dom = None
+        self.error = None
 
+    def run(self):
+        try:
+            if(self.is_name_value_format): self.dom = ccdb.read_namevalue_text_file(self.data_file_path, True)
+            else: self.dom = ccdb.read_ccdb_text_file(self.data_file_path)
+        except Exception as error:
+            self.error = error
 
+    def get_dom(self):
+        """Waits the file is read and returns dom. Error of reading is raised here"""
+        self.join()
+        if self.error is not None: raise self.error
+        return self.dom
 
-#-----------------------------
-# ***    PARSE XML DIRS    ***
-#-----------------------------
-dirs_xmldoc = minidom.parse(os.path.join(rules_xml_dir, 'directory.xml')) 
-xml_dirs_names = [f.attributes["name"].value for f in dirs_xmldoc.getElementsByTagName('directory')]
 
-#-----------------------------
-# ***    PARSE ARGS        ***
-#-----------------------------
-import argparse
- 
-parser = argparse.ArgumentParser(description='Converts existing svn HallD collibrations to CCDB callibrations.')
-parser.add_argument('-r','--rehearsal', action="store_true", default=False, help='Run script to view what will be done. Script will run everything, but instead of invoking ccdb commands, they will be printed on screen') 
-parser.add_argument('-e','--execute', action="store_true", default=False, help='Run script and execute ccdb commands')
-parser.add_argument('-v','--verbose', action="store_true", default=False, help='Print additional info')
-parser.add_argument('-c','--colorless', action="store_true", default=True, help='Use colors for output')
-
-result = parser.parse_args()
-#(execute_commands, is_reharsal) = result
-
-execute_ccdb_commands = result.execute
-is_reharsal = result.rehearsal
-is_verbose = result.verbose
-if result.colorless: ccdbcmd_opts = ccdbcmd_opts+" --no-color"
-#-----------------------------
-# *** PRINT CONFIGURATION  ***
-#-----------------------------
-print "CCDB path:      " + ccdb_dir
-print "CCDB options:   " + ccdbcmd_opts
-print "SVN calib:      " + calib_dir
-print "Converse rules: " + rules_dir
-print "Cnv. rules xml: " + rules_xml_dir
-print " execute_commands " + repr(execute_ccdb_commands)
-print " is_reharsal " + repr(is_reharsal)
-print " is verbose " + repr(is_verbose)
+def start_data_file_reader(xml_table, ccdb_parent_path):
+    reader = DataFileReader(xml_table, ccdb_parent_path)
+    reader.start()
+    return reader
 
 
 #-----------------------------------------------------"
@@ -125,179 +87,283 @@ def process_file(home_dir, rule_file_name, ccdb_parent_path):
     
     #parse xml file
     rule_file_path = os.path.join(home_dir, rule_file_name);
-    xmldoc = minidom.parse(rule_file_path) 
+    xmldoc = ElementTree.parse(rule_file_path)
 
     #>oO
-    print "  Processing file " + rule_file_path
-    print "  ***********************************************"
+    log.info("  Processing file %s", rule_file_path)
+    log.info("  ***********************************************")
     
     #get type tables    
-    xml_tables = xmldoc.getElementsByTagName('type')
+    xml_tables = list(xmldoc.iter('type'))
+
+    #data file of the next table is read while the current table goes to the database
+    next_reader = start_data_file_reader(xml_tables[0], ccdb_parent_path) if xml_tables else None
 
     #iterate type tables
-    for xml_table in xml_tables:
+    for table_index, xml_table in enumerate(xml_tables):
+        reader = next_reader
+        if table_index + 1 < len(xml_tables):
+            next_reader = start_data_file_reader(xml_tables[table_index + 1], ccdb_parent_path)
 
         #parameters
-        table_name = xml_table.attributes['name'].value
-        nrows = int(xml_table.attributes['nrow'].value)
-        is_name_value_format = bool(int(xml_table.attributes['namevalue'].value))
+        table_name = xml_table.get('name')
+        nrows = int(xml_table.get('nrow'))
+        is_name_value_format = bool(int(xml_table.get('namevalue')))
 
         #comments
-        comments = ''
-        xml_comments = xml_table.getElementsByTagName('comment')
-        if len(xml_comments):
-            comments = " ".join(t.nodeValue for t in xml_comments[0].childNodes if t.nodeType == t.TEXT_NODE)
-        comments.replace("\r\n", "\\n")
-        comments.replace("\n","\\n")
-        comments.replace('"',"'")
+        comments = u''
+        xml_comment = xml_table.find('.//comment')
+        if xml_comment is not None:
+            #text nodes of the comment are its text and the tails of its children
+            comments = u" ".join(t for t in [xml_comment.text] + [child.tail for child in xml_comment] if t)
+        comments = comments.translate(comments_translate_table)
 
             #comments = comments.replace("\\n",os.linesep)
         
         #print out what we've got
-        print "     Process table: " + table_name
-        print "     Comments: " 
-        print "     " + comments[0:50]
-        print "     Rows Number: " + str(nrows)
-        print "     Is namevalue: " + repr(is_name_value_format)
+        log.info("     Process table: %s", table_name)
+        log.info("     Comments: ")
+        log.info("     %s", comments[0:50])
+        log.info("     Rows Number: %s", nrows)
+        log.info("     Is namevalue: %r", is_name_value_format)
         
 
-        #iterate columns, create columns command
-        columns_create_command = ''
-        xml_columns = xml_table.getElementsByTagName('column')
-        if not is_verbose: print "    Columns : " + repr(len(xml_columns))
-        else: print "    Columns: "
-        for xml_column in xml_columns:
-            column_name = xml_column.attributes['name'].value
-            column_type = xml_column.attributes['type'].value
-            if(is_verbose): print "      {:<35} = {}".format(column_name, column_type)
-            columns_create_command+=' "{}={}"'.format(column_name, column_type)
+        #get columns as (name, type) pairs, create columns command
+        columns = [(xml_column.get('name'), xml_column.get('type')) for xml_column in xml_table.iter('column')]
+        columns_create_command = ''.join(' "{}={}"'.format(name, col_type) for name, col_type in columns)
+        if not is_verbose: log.info("    Columns : %r", len(columns))
+        else:
+            log.debug("    Columns: ")
+            for name, col_type in columns:
+                log.debug("      %-35s = %s", name, col_type)
 
         #create table command
-        table_path = (ccdb_parent_path + "/" + table_name).replace("//","/")
+        table_path = posixpath.join(ccdb_parent_path or "/", table_name)
         create_table_command = 'ccdb ' + ccdbcmd_opts +' mktbl  --no-quantity {0} -r {1} {2} "#{3}"'
         create_table_command = create_table_command.format(table_path, nrows, columns_create_command, "")
 
-        print "    Create command"
-        print "    " + create_table_command
-#        print "    " + create_table_command[0:50]+" ... "
+        log.info("    Create command")
+        log.info("    %s", create_table_command)
         if(execute_ccdb_commands):
-            (code, response) = get_status_output(create_table_command)
-            print code, response
-            if code!=0 or "error" in response or "failed" in response: exit("Conversion aborted")
+            provider.create_type_table(table_name, ccdb_parent_path or "/", nrows, columns)
         
-        print
-        print "  Filling data "
-        print "  ============================================="
+        log.info("")
+        log.info("  Filling data ")
+        log.info("  =============================================")
         
 
         #now fill it with data
 
-        data_file_path = os.path.join(ccdb_parent_path, table_name)
-        data_file_path = (calib_dir + "/" + data_file_path).replace("//","/")
-        print "     Data file is: " + data_file_path
+        data_file_path = reader.data_file_path
+        log.info("     Data file is: %s", data_file_path)
 
         #read dom
-        dom = ccdb.TextFileDOM()
-        if(is_name_value_format): dom = ccdb.read_namevalue_text_file(data_file_path)
-        else: dom = ccdb.read_ccdb_text_file(data_file_path)
+        dom = reader.get_dom()
         
         #print verbose info
         if is_verbose:
-            print dom.column_names
-            print dom.rows
+            log.debug("%s", dom.column_names)
+            log.debug("%s", dom.rows)
             for i in range(min(len(dom.column_names),50)):
-                print "{:>35}     {}".format(dom.column_names[i], dom.rows[0][i])
+                log.debug("%35s     %s", dom.column_names[i], dom.rows[0][i])
 
         add_command = "ccdb " + ccdbcmd_opts + " add  --c-comments "
         if(is_name_value_format) : add_command += "--name-value "
         add_command += table_path +" -v default -r 0- " + data_file_path
-        print add_command
+        log.info("%s", add_command)
         
         if(execute_ccdb_commands):
-            (code, response) = get_status_output(add_command)
-            print code, response
-            if code!=0 or "error" in response or "failed" in response: exit("Conversion aborted")
-
-        print "  ============================================="
-        print "  Finished with file "
+            #the same as 'ccdb add' does, but with the dom we've already read
+            if not dom.data_is_consistent:
+                log.error("Inconsistency error. %s", dom.inconsistent_reason)
+                exit("Conversion aborted")
+            assignment = provider.create_assignment(dom, table_path, 0, ccdb.INFINITE_RUN, "default",
+                                                    "\n".join(dom.comment_lines))
+            log.info("%s", assignment.request)
+
+        log.info("  =============================================")
+        log.info("  Finished with file ")
         
 
 
 #-----------------------------------------------------"
 # process_directories
 #-----------------------------------------------------"
-def process_directories(processing_dir):
-    """ Create all directories according to rules_xml_dir"""
+def process_directories(processing_dir, ccdb_parent_path=""):
+    """ Create all directories according to rules_xml_dir
+
+    ccdb_parent_path is ccdb directory that corresponds to processing_dir ("" for rules_xml_dir itself)
+    """
     
-    print
-    print "----------------------------------------------------------------------------------------------------------"
-    print "Entered directory  " + processing_dir
-    print "----------------------------------------------------------------------------------------------------------"
-    print
+    log.info("")
+    log.info("----------------------------------------------------------------------------------------------------------")
+    log.info("Entered directory  %s", processing_dir)
+    log.info("----------------------------------------------------------------------------------------------------------")
+    log.info("")
     
-    #get ccdb directory that corresponds to this directory
-    ccdb_dir = processing_dir[len(rules_xml_dir):].replace("\\","/")
-    print processing_dir[len(rules_xml_dir):]
-    print "  CCDB parent path that corresponds to this directory: "
-    print "  " + ccdb_dir
-    print
-
-    #get all xml files in the directory
-    sub_files = [f 
-                 for f in os.listdir(processing_dir) 
-                 if os.path.isfile(os.path.join(processing_dir, f)) and f.endswith(".xml")
-                 ]
-    print "  Found " + repr(len(sub_files)) + " files"
+    log.info("  CCDB parent path that corresponds to this directory: ")
+    log.info("  %s", ccdb_parent_path)
+    log.info("")
+
+    #get all xml files and subdirectories in one pass, so each entry is stat-ed once
+    sub_files = []
+    sub_dirs = []
+    for name in os.listdir(processing_dir):
+        if name == '.svn': continue
+        entry_path = os.path.join(processing_dir, name)
+        if name.endswith(".xml") and os.path.isfile(entry_path):
+            sub_files.append(name)
+        elif os.path.isdir(entry_path):
+            sub_dirs.append(name)
+    log.info("  Found %r files", len(sub_files))
 
     #iterate and process xml files
     for filename in sub_files:
-        process_file(processing_dir, filename, ccdb_dir)
+        process_file(processing_dir, filename, ccdb_parent_path)
 
     
-    print "  Scanning for subdirectories"
-    sub_dirs = [dir 
-                for dir in os.listdir(processing_dir) 
-                if os.path.isdir(os.path.join(processing_dir, dir)) and not dir == '.svn'
-                ]
-    
+    log.info("  Scanning for subdirectories")
     if not len(sub_dirs): return
 
     for directory in sub_dirs:
-        print "  found subdirectory " + directory
-        create_directory(directory, ccdb_dir)
-        process_directories(os.path.join(processing_dir, directory))
+        log.info("  found subdirectory %s", directory)
+        ccdb_dir_path = create_directory(directory, ccdb_parent_path)
+        process_directories(os.path.join(processing_dir, directory), ccdb_dir_path)
 
 
     #print "Xml dir names"
     #for xml_name in xml_dirs_names:
-    #    print xml_name
+    #    log.info(xml_name)
     #create_directory(dir, '/')
-    print "==================================================================================================="
-    print "CONVERSION IS SUCCESSFULL"
+    log.info("===================================================================================================")
+    log.info("CONVERSION IS SUCCESSFULL")
 
 #----------------------------------
 def create_directory(dir_name, parent_path):
-    path = (parent_path + "/" + dir_name).replace("//","/")
-    print "creating ccdb directory: " + path
+    path = posixpath.join(parent_path or "/", dir_name)
+    log.info("creating ccdb directory: %s", path)
     command = "ccdb " + ccdbcmd_opts + " mkdir " + path
-    print command
+    log.info("%s", command)
     if(execute_ccdb_commands):
-        (code, response) = get_status_output(command)
-        print code, response
-        if code!=0 or "error" in response or "failed" in response: exit("Conversion aborted")
-    print "here"
-
-
-def get_status_output(cmd):
-    pipe = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, universal_newlines=True)
-    (output, errout) = pipe.communicate(None)
-    #assert not errout
-    status = pipe.returncode
-    return (status, output)
-    
+        #the same provider is used for tables, so it knows about the new directory without reloading
+        provider.create_directory(dir_name, parent_path or "/")
+    return path
 
-if execute_ccdb_commands or is_reharsal:
-    
-    process_directories(rules_xml_dir);
 
-    
+#-----------------------------------------------------"
+# main
+#-----------------------------------------------------"
+def main():
+    global ccdbcmd_opts, calib_dir, rules_xml_dir, execute_ccdb_commands, is_verbose, provider
+
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
+
+    log.info("""
+============================
+SVN CALIB to CCDB convertion
+============================
+
+This script aims to convers SVN file based GluEx calibration constats set to CCDB database
+
+Three environment variables must be set:
+CCDB_HOME - ccdb package home dir
+JANA_CALIB_URL - Jana callib url in form of file://path/to/data
+JANA_CALIB_RULES - path to xml files with conversion rules 
+
+run this script with '--rehearsal' flag to see what will be done. 
+run this script with '--execute' flag will execute ccdb commands
+""")
+
+
+    #--------------------------
+    #  CONFIGURE  CCDB  PACKAGE 
+    #-------------------------- 
+
+    #ccdb pakage path
+    if not "CCDB_HOME" in os.environ:
+        log.error("CCDB_HOME must be set")
+        exit(1)
+
+    ccdb_dir = os.environ['CCDB_HOME']
+
+    #configure ccdbcmd
+    ccdbcmd_opts = ""
+
+    #ccdb database. The same environment variables as for ccdb command are used
+    ccdb_connection_string = os.environ.get("CCDB_CONNECTION", "mysql://ccdb_user@localhost/ccdb")
+    ccdb_user_name = os.environ.get("CCDB_USER", "anonymous")
+
+
+    #--------------------------------------------
+    # *** CONFIGURE  SVN CALIBRATION  PACKAGE ***
+    #--------------------------------------------
+
+    if not "JANA_CALIB_URL" in  os.environ:
+        log.error("JANA_CALIB_URL must be set")
+        exit(1)
+
+    #this is directory with calib data
+    calib_dir = os.environ['JANA_CALIB_URL']
+    calib_dir = calib_dir[7:] #skip 'file://' part
+
+    #-------------------------------------
+    # *** CONFIGURE  CONVERSION RULES  ***
+    #-------------------------------------
+
+    if not "JANA_CALIB_RULES" in  os.environ:
+        log.error("JANA_CALIB_RULES must be set")
+        exit(1)
+
+    #this is 'rules dir' the directory where xml files with data table definition are located
+    rules_dir = os.environ['JANA_CALIB_RULES']
+    rules_xml_dir = os.path.join(rules_dir, 'xml')
+
+
+    #-----------------------------
+    # ***    PARSE ARGS        ***
+    #-----------------------------
+    parser = argparse.ArgumentParser(description='Converts existing svn HallD collibrations to CCDB callibrations.')
+    parser.add_argument('-r','--rehearsal', action="store_true", default=False, help='Run script to view what will be done. Script will run everything, but instead of invoking ccdb commands, they will be printed on screen') 
+    parser.add_argument('-e','--execute', action="store_true", default=False, help='Run script and execute ccdb commands')
+    parser.add_argument('-v','--verbose', action="store_true", default=False, help='Print additional info')
+    parser.add_argument('-c','--colorless', action="store_true", default=True, help='Use colors for output')
+
+    result = parser.parse_args()
+    #(execute_commands, is_reharsal) = result
+
+    execute_ccdb_commands = result.execute
+    is_reharsal = result.rehearsal
+    is_verbose = result.verbose
+    if is_verbose: log.setLevel(logging.DEBUG)
+    if result.colorless: ccdbcmd_opts = ccdbcmd_opts+" --no-color"
+    #-----------------------------
+    # *** PRINT CONFIGURATION  ***
+    #-----------------------------
+    log.info("CCDB path:      %s", ccdb_dir)
+    log.info("CCDB options:   %s", ccdbcmd_opts)
+    log.info("CCDB database:  %s", ccdb_connection_string)
+    log.info("SVN calib:      %s", calib_dir)
+    log.info("Converse rules: %s", rules_dir)
+    log.info("Cnv. rules xml: %s", rules_xml_dir)
+    log.info(" execute_commands %r", execute_ccdb_commands)
+    log.info(" is_reharsal %r", is_reharsal)
+    log.info(" is verbose %r", is_verbose)
+
+    #-----------------------------
+    # ***    PARSE XML DIRS    ***
+    #-----------------------------
+    if not (execute_ccdb_commands or is_reharsal): return
+
+    dirs_xmldoc = ElementTree.parse(os.path.join(rules_xml_dir, 'directory.xml'))
+    xml_dirs_names = [f.get("name") for f in dirs_xmldoc.iter('directory')]
+
+    if execute_ccdb_commands:
+        provider = ccdb.AlchemyProvider()
+        provider.connect(ccdb_connection_string)
+        provider.authentication.current_user_name = ccdb_user_name
+
+    process_directories(rules_xml_dir)
+
+
+if __name__ == '__main__':
+    main()